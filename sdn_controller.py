@@ -2,26 +2,160 @@
 # Basic SDN Controller Implementation
 # SHA-256 Hash: a43f75ba5b044c25e1280cea21b6e43599f8638a0b8550436ea99ea02e5868ca
 
+import bisect
 import hashlib
-import time
+import heapq
 import cmd
+import threading
+from array import array
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+try:
+    import numpy as np
+except ImportError:  # All-pairs precomputation is skipped without NumPy
+    np = None
 
 # Calculate SHA-256 hash of student ID + provided string
 STUDENT_ID = "898927734"
 HASH_TEXT = STUDENT_ID + "NeoDDaBRgX5a9"
 WATERMARK = hashlib.sha256(HASH_TEXT.encode()).hexdigest()
 
+# Number of ranked paths precomputed per (src, dst) pair for failover
+K_SHORTEST_PATHS = 3
+
+# Largest topology for which all-pairs shortest paths are precomputed
+APSP_MAX_NODES = 500
+
+# Unconstrained searches at one topology version before the all-pairs table is built
+APSP_BUILD_AFTER = 32
+
+# Smallest topology for which Dijkstra runs in the Numba-compiled kernel
+JIT_MIN_NODES = 1000
+
+# Upper bound on threads used to search new paths after a link failure
+REROUTE_WORKERS = 8
+
+# Number of memoized path search results kept between topology changes
+ROUTE_CACHE_SIZE = 4096
+
+def _pack(src, dst):
+    """Pack a pair of node indices into the integer key used for links"""
+    return (src << 32) | dst
+
+def _unpack(link_key):
+    """Split a packed link key back into (src, dst) node indices"""
+    return link_key >> 32, link_key & 0xFFFFFFFF
+
+def _prio_key(entry):
+    """Sort key that orders flow table entries by priority, highest first"""
+    return -entry.priority
+
+def _dijkstra_kernel(indptr, indices, weights, residual, blocked_edges, blocked_nodes, bandwidth, src, dst):
+    """
+    Dijkstra over a CSR adjacency with an array-based binary heap.
+    Returns (dist, parent) arrays; parent[dst] is -1 when dst is unreachable.
+    """
+    n = indptr.shape[0] - 1
+    dist = np.full(n, np.inf)
+    parent = np.full(n, -1, dtype=np.int32)
+    settled = np.zeros(n, dtype=np.uint8)
+    
+    # Every successful relaxation pushes at most one entry
+    heap_dist = np.empty(indices.shape[0] + 1, dtype=np.float64)
+    heap_node = np.empty(indices.shape[0] + 1, dtype=np.int32)
+    heap_dist[0] = 0.0
+    heap_node[0] = src
+    size = 1
+    dist[src] = 0.0
+    
+    while size > 0:
+        d = heap_dist[0]
+        u = heap_node[0]
+        
+        # Pop: move the last entry to the root and sift it down
+        size -= 1
+        if size > 0:
+            last_dist = heap_dist[size]
+            last_node = heap_node[size]
+            i = 0
+            while True:
+                child = 2 * i + 1
+                if child >= size:
+                    break
+                if child + 1 < size and heap_dist[child + 1] < heap_dist[child]:
+                    child += 1
+                if heap_dist[child] >= last_dist:
+                    break
+                heap_dist[i] = heap_dist[child]
+                heap_node[i] = heap_node[child]
+                i = child
+            heap_dist[i] = last_dist
+            heap_node[i] = last_node
+        
+        if settled[u]:
+            continue
+        if u == dst:
+            break
+        settled[u] = 1
+        
+        for e in range(indptr[u], indptr[u + 1]):
+            v = indices[e]
+            if settled[v] or blocked_nodes[v] or blocked_edges[e] or residual[e] < bandwidth:
+                continue
+            new_dist = d + weights[e]
+            if new_dist < dist[v]:
+                dist[v] = new_dist
+                parent[v] = u
+                
+                # Push: sift the new entry up from the end
+                i = size
+                size += 1
+                while i > 0:
+                    up = (i - 1) // 2
+                    if heap_dist[up] <= new_dist:
+                        break
+                    heap_dist[i] = heap_dist[up]
+                    heap_node[i] = heap_node[up]
+                    i = up
+                heap_dist[i] = new_dist
+                heap_node[i] = v
+    
+    return dist, parent
+
+# Numba-compiled _dijkstra_kernel, or False once Numba turned out to be missing.
+# Numba is only imported on the first search that needs it, as importing it
+# costs far more than the rest of this module's startup
+_compiled_kernel = None
+_compile_lock = threading.Lock()
+
+def _jit_kernel():
+    """Return the compiled Dijkstra kernel, compiling it on first use (None without Numba)"""
+    global _compiled_kernel
+    if _compiled_kernel is None:
+        with _compile_lock:
+            if _compiled_kernel is None:
+                try:
+                    from numba import njit
+                except ImportError:  # Large topologies fall back to the pure Python Dijkstra
+                    _compiled_kernel = False
+                else:
+                    _compiled_kernel = njit(cache=True, nogil=True)(_dijkstra_kernel)
+    return _compiled_kernel or None
+
 class Flow:
     """Represents a network flow between two endpoints"""
+    __slots__ = ('src', 'dst', 'flow_id', 'priority', 'bandwidth', 'path', 'backup_path', 'active')
+    
     def __init__(self, src, dst, flow_id, priority=0, bandwidth=1):
         self.src = src
         self.dst = dst
         self.flow_id = flow_id
         self.priority = priority
         self.bandwidth = bandwidth
-        self.path = []
-        self.backup_path = []
+        self.path = array('i')  # node indices, see SDNController.node_idx
+        self.backup_path = array('i')
         self.active = True
         
     def __str__(self):
@@ -29,6 +163,8 @@ class Flow:
 
 class Link:
     """Represents a network link between two nodes"""
+    __slots__ = ('src', 'dst', 'capacity', 'weight', 'delay', 'utilization', 'flows')
+    
     def __init__(self, src, dst, capacity=10, weight=1, delay=1):
         self.src = src
         self.dst = dst
@@ -52,6 +188,26 @@ class Link:
             self.flows.remove(flow.flow_id)
             self.utilization -= flow.bandwidth
 
+class FlowEntry:
+    """Represents a flow table entry installed on a switch"""
+    __slots__ = ('src', 'dst', 'flow_id', 'output', 'priority', 'packet_count', 'byte_count', 'last_match')
+    
+    def __init__(self, src, dst, flow_id, output, priority, last_match):
+        # Match
+        self.src = src
+        self.dst = dst
+        self.flow_id = flow_id
+        # Action
+        self.output = output
+        self.priority = priority
+        # Stats
+        self.packet_count = 0
+        self.byte_count = 0
+        self.last_match = last_match
+        
+    def __str__(self):
+        return f"Entry {self.flow_id}: {self.src} → {self.dst} (Output: {self.output}, Priority: {self.priority})"
+
 class SDNController:
     """
     Basic SDN Controller that manages a network topology, flows, and flow tables
@@ -59,13 +215,39 @@ class SDNController:
     def __init__(self):
         # Network nodes and edges
         self.nodes = set()
-        self.links = {}  # (src, dst) -> Link object
+        self.node_idx = {}  # node_id -> dense integer index used in paths and link keys
+        self.node_name = []  # integer index -> node_id
+        self.links = {}  # _pack(src_idx, dst_idx) -> Link object
+        self.adj = defaultdict(set)  # src_idx -> set of dst_idx (outgoing links)
+        self.radj = defaultdict(set)  # dst_idx -> set of src_idx (incoming links)
+        
+        # Bumped on every node/link change; derived routing state is tied to it
+        self.topo_version = 0
+        # Inside batch(), changes only mark the topology dirty
+        self._batch_depth = 0
+        self._topology_dirty = False
+        # All-pairs (dist, next_hop) matrices, rebuilt after topology changes
+        self._apsp = None
+        self._apsp_queries = 0  # Unconstrained searches since the last topology change
+        self._in_failover = False  # Set while simulate_link_failure reroutes flows
+        # CSR (indptr, indices, weights, residual, edge_of) arrays for the JIT kernel
+        self._csr = None
+        # Memoized searches: (src, dst, banned_links, bandwidth, banned_nodes) -> path
+        self._route_cache = {}
+        self._route_cache_version = 0
+        # Guards the lazy builds and route cache against concurrent reroute searches
+        self._lock = threading.Lock()
         
         # Flow tracking
         self.flows = {}  # flow_id -> Flow object
         
         # Flow table for each switch (node)
         self.flow_tables = defaultdict(list)
+        self.flow_entries = {}  # flow_id -> [(node, entry)] installed for that flow
+        self._tick = 0  # Monotonic install counter used to timestamp entries
+        
+        # Ranked candidate paths used for failover
+        self.path_cache = {}  # (src_idx, dst_idx) -> [path, ...] shortest first
         
         # Statistics
         self.stats = {
@@ -83,6 +265,10 @@ class SDNController:
         """Add a switch/node to the network topology"""
         if node_id not in self.nodes:
             self.nodes.add(node_id)
+            if node_id not in self.node_idx:
+                self.node_idx[node_id] = len(self.node_name)
+                self.node_name.append(node_id)
+            self._topology_changed()
             self.stats['total_switches'] += 1
             return True
         return False
@@ -90,17 +276,22 @@ class SDNController:
     def remove_node(self, node_id):
         """Remove a switch/node from the network topology"""
         if node_id in self.nodes:
-            # Remove all associated links
-            links_to_remove = []
-            for src, dst in self.links:
-                if src == node_id or dst == node_id:
-                    links_to_remove.append((src, dst))
+            # Remove all associated links; adj/radj are the node's incidence
+            # sets and _remove_link leaves path_cache to be pruned at lookup,
+            # so this is O(degree) rather than a scan of self.links
+            node = self.node_idx[node_id]
+            links_to_remove = [_pack(node, dst) for dst in self.adj[node]]
+            links_to_remove += [_pack(src, node) for src in self.radj[node]]
+            
+            for link_key in links_to_remove:
+                self._remove_link(link_key)
             
-            for link in links_to_remove:
-                self.remove_link(link[0], link[1])
+            del self.adj[node]
+            del self.radj[node]
             
             # Remove the node
             self.nodes.remove(node_id)
+            self._topology_changed()
             
             # Clean up flow tables
             if node_id in self.flow_tables:
@@ -117,28 +308,72 @@ class SDNController:
             return False
             
         # Create link object
-        link_key = (src, dst)
-        self.links[link_key] = Link(src, dst, capacity, weight, delay)
+        u, v = self.node_idx[src], self.node_idx[dst]
+        self.links[_pack(u, v)] = Link(src, dst, capacity, weight, delay)
+        self.adj[u].add(v)
+        self.radj[v].add(u)
+        # Cached failover candidates stay valid; they may just no longer be the shortest
+        self._topology_changed()
         
         self.stats['total_links'] += 1
         
         # If bidirectional, add the reverse link as well
-        if bidirectional and (dst, src) not in self.links:
+        if bidirectional and _pack(v, u) not in self.links:
             self.add_link(dst, src, capacity, weight, delay, False)
             
         return True
                 
     def remove_link(self, src, dst):
         """Remove a link from the network"""
-        link_key = (src, dst)
+        return self._remove_link(self._link_key(src, dst))
+    
+    def _remove_link(self, link_key):
+        """Remove a link given its packed key"""
         if link_key in self.links:
             # Remove link object
             del self.links[link_key]
+            u, v = _unpack(link_key)
+            self.adj[u].discard(v)
+            self.radj[v].discard(u)
+            self._topology_changed()
             
             self.stats['total_links'] -= 1
             return True
         return False
+    
+    def _link_key(self, src, dst):
+        """Map a pair of node ids to the key used in self.links (None if either is unknown)"""
+        u, v = self.node_idx.get(src), self.node_idx.get(dst)
+        if u is None or v is None:
+            return None
+        return _pack(u, v)
             
+    @contextmanager
+    def batch(self):
+        """Group topology changes so routing state is invalidated once at the end"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._topology_dirty:
+                self._invalidate_routing()
+    
+    def _topology_changed(self):
+        """Record a node/link change, deferring invalidation while batched"""
+        if self._batch_depth:
+            self._topology_dirty = True
+        else:
+            self._invalidate_routing()
+    
+    def _invalidate_routing(self):
+        """Invalidate routing state derived from the current topology"""
+        self._topology_dirty = False
+        self.topo_version += 1
+        self._apsp = None
+        self._apsp_queries = 0
+        self._csr = None
+    
     def add_flow(self, src, dst, priority=0, bandwidth=1):
         """Add a new flow to the network"""
         # Check if src and dst exist
@@ -151,8 +386,9 @@ class SDNController:
         # Create flow object
         flow = Flow(src, dst, flow_id, priority, bandwidth)
         
-        # Compute a simple path (direct link or through one hop)
-        path = self._find_simple_path(src, dst)
+        # Compute the shortest path with enough spare capacity
+        u, v = self.node_idx[src], self.node_idx[dst]
+        path = self._find_simple_path(u, v, bandwidth)
         if not path:
             print(f"No path found for flow {flow_id}: {src} → {dst}")
             return None
@@ -160,10 +396,14 @@ class SDNController:
         flow.path = path
         
         # Try to compute a backup path
-        backup_path = self._find_backup_path(src, dst, path)
+        backup_path = self._find_backup_path(u, v, path, bandwidth)
         if backup_path:
             flow.backup_path = backup_path
         
+        # Precompute failover candidates for this pair, unless still cached
+        if not self._cached_paths((u, v)):
+            self.path_cache[(u, v)] = self._k_shortest_paths(u, v, K_SHORTEST_PATHS)
+        
         # Install flow in the network
         self._install_flow(flow)
         
@@ -176,79 +416,276 @@ class SDNController:
         
         return flow
     
-    def _find_simple_path(self, src, dst):
-        """Find a simple path between src and dst (direct or one hop)"""
-        # Check direct link
-        if (src, dst) in self.links:
-            return [src, dst]
+    def _find_simple_path(self, src, dst, bandwidth=0):
+        """Find the shortest path between src and dst with room for bandwidth"""
+        return self._shortest_path(src, dst, bandwidth=bandwidth)
+    
+    def _shortest_path(self, src, dst, banned_links=frozenset(), bandwidth=0, banned_nodes=frozenset()):
+        """
+        Find the lowest-weight path between node indices src and dst using Dijkstra.
+        Links in banned_links, nodes in banned_nodes and links without
+        `bandwidth` spare capacity are skipped.
+        """
+        if src == dst:
+            return array('i', [src])
+        
+        # Path queries inside a batch must see the changes made so far
+        if self._topology_dirty:
+            with self._lock:
+                if self._topology_dirty:
+                    self._invalidate_routing()
         
-        # Try one-hop paths
-        for node in self.nodes:
-            if (src, node) in self.links and (node, dst) in self.links:
-                return [src, node, dst]
+        key = (src, dst, frozenset(banned_links), bandwidth, frozenset(banned_nodes))
+        with self._lock:
+            if self._route_cache_version != self.topo_version:
+                self._route_cache.clear()
+                self._route_cache_version = self.topo_version
+            path = self._route_cache.pop(key, None)
+            if path is not None:
+                # Re-insert to mark as most recently used
+                self._route_cache[key] = path
         
-        # If no path found, try to find any path
-        return self._find_any_path(src, dst)
+        # Utilization only grew since the search, so a path that still has
+        # room is still the shortest and a failed search still fails
+        if path is None or (path and not self._has_capacity(path, bandwidth)):
+            path = self._search_shortest_path(src, dst, banned_links, bandwidth, banned_nodes)
+            with self._lock:
+                self._route_cache[key] = path
+                if len(self._route_cache) > ROUTE_CACHE_SIZE:
+                    del self._route_cache[next(iter(self._route_cache))]
+        return path
     
-    def _find_any_path(self, src, dst):
-        """Find any path between src and dst using simple BFS"""
-        if src == dst:
-            return [src]
+    def _search_shortest_path(self, src, dst, banned_links, bandwidth, banned_nodes):
+        """Run the shortest path search behind _shortest_path's cache"""
+        # Repeated unconstrained queries on small topologies use the all-pairs table
+        if (not banned_links and not banned_nodes and np is not None
+                and len(self.node_name) <= APSP_MAX_NODES and self._use_apsp()):
+            path = self._apsp_path(src, dst)
+            if not path or self._has_capacity(path, bandwidth):
+                return path
+        
+        # Large topologies run Dijkstra in the compiled kernel
+        if len(self.node_name) >= JIT_MIN_NODES and _jit_kernel() is not None:
+            return self._jit_shortest_path(src, dst, banned_links, bandwidth, banned_nodes)
+            
+        dist = {src: 0}
+        parent = {src: None}
+        # Banned nodes are treated as already settled so they are never expanded
+        settled = set(banned_nodes)
+        heap = [(0, src)]
+        
+        # Group banned links by source so they drop out in the set difference below
+        banned_out = defaultdict(set)
+        for link_key in banned_links:
+            u, v = _unpack(link_key)
+            banned_out[u].add(v)
+        
+        while heap:
+            d, node = heapq.heappop(heap)
+            if node == dst:
+                return self._trace_path(parent, parent[dst], dst)
+            if node in settled:
+                continue
+            settled.add(node)
+            
+            # Relax all usable outgoing links to unsettled neighbors
+            neighbors = self._get_neighbors(node) - settled
+            if node in banned_out:
+                neighbors -= banned_out[node]
+            for neighbor in neighbors:
+                link = self.links[(node << 32) | neighbor]  # _pack, inlined
+                if link.utilization + bandwidth > link.capacity:
+                    continue
+                    
+                new_dist = d + link.weight
+                if new_dist < dist.get(neighbor, float('inf')):
+                    dist[neighbor] = new_dist
+                    parent[neighbor] = node
+                    heapq.heappush(heap, (new_dist, neighbor))
+        
+        return array('i')
+    
+    def _use_apsp(self):
+        """Decide whether the all-pairs table should answer an unconstrained query"""
+        if self._apsp is not None:
+            return True
+        # The rebuild only pays off once a topology serves many queries, and
+        # failover must not pay for it right after the link was removed
+        if self._in_failover:
+            return False
+        self._apsp_queries += 1
+        return self._apsp_queries >= APSP_BUILD_AFTER
+    
+    def _build_apsp(self):
+        """Compute all-pairs shortest paths with a vectorized Floyd-Warshall"""
+        n = len(self.node_name)
+        dist = np.full((n, n), np.inf, dtype=np.float32)
+        next_hop = np.full((n, n), -1, dtype=np.int32)
+        
+        for link_key, link in self.links.items():
+            i, j = _unpack(link_key)
+            dist[i, j] = link.weight
+            next_hop[i, j] = j
+        
+        diag = np.arange(n)
+        dist[diag, diag] = 0
+        next_hop[diag, diag] = diag
+        
+        for k in range(n):
+            via = dist[:, k:k+1] + dist[k:k+1, :]
+            better = via < dist
+            np.copyto(dist, via, where=better)
+            np.copyto(next_hop, np.broadcast_to(next_hop[:, k:k+1], (n, n)), where=better)
+        
+        self._apsp = (dist, next_hop)
+    
+    def _apsp_path(self, src, dst):
+        """Reconstruct the shortest path from src to dst out of the all-pairs table"""
+        apsp = self._apsp
+        if apsp is None:
+            with self._lock:
+                if self._apsp is None:
+                    self._build_apsp()
+                apsp = self._apsp
+        next_hop = apsp[1]
+        
+        i, j = src, dst
+        if next_hop[i, j] < 0:
+            return array('i')
+            
+        path = array('i', [i])
+        while i != j:
+            i = int(next_hop[i, j])
+            path.append(i)
+        return path
+    
+    def _build_csr(self):
+        """Pack the adjacency into CSR arrays for the compiled Dijkstra kernel"""
+        n = len(self.node_name)
+        indptr = np.zeros(n + 1, dtype=np.int32)
+        indices = np.empty(len(self.links), dtype=np.int32)
+        weights = np.empty(len(self.links), dtype=np.float64)
+        residual = np.empty(len(self.links), dtype=np.float64)
+        edge_of = {}  # packed link key -> position in indices
+        
+        e = 0
+        for i in range(n):
+            for j in self.adj.get(i, ()):
+                link_key = _pack(i, j)
+                link = self.links[link_key]
+                indices[e] = j
+                weights[e] = link.weight
+                residual[e] = link.capacity - link.utilization
+                edge_of[link_key] = e
+                e += 1
+            indptr[i + 1] = e
+        
+        self._csr = (indptr, indices, weights, residual, edge_of)
+    
+    def _update_residual(self, link_key):
+        """Mirror a link's spare capacity into the CSR arrays, if built"""
+        if self._csr is not None:
+            link = self.links[link_key]
+            residual, edge_of = self._csr[3], self._csr[4]
+            if link_key in edge_of:
+                residual[edge_of[link_key]] = link.capacity - link.utilization
+    
+    def _jit_shortest_path(self, src, dst, banned_links, bandwidth, banned_nodes):
+        """Run the compiled Dijkstra kernel and rebuild the path from its parent array"""
+        csr = self._csr
+        if csr is None:
+            with self._lock:
+                if self._csr is None:
+                    self._build_csr()
+                csr = self._csr
+        indptr, indices, weights, residual, edge_of = csr
+        
+        blocked_edges = np.zeros(len(indices), dtype=np.uint8)
+        for link_key in banned_links:
+            if link_key in edge_of:
+                blocked_edges[edge_of[link_key]] = 1
+        blocked_nodes = np.zeros(len(indptr) - 1, dtype=np.uint8)
+        for node in banned_nodes:
+            blocked_nodes[node] = 1
+        
+        _, parent = _jit_kernel()(indptr, indices, weights, residual, blocked_edges, blocked_nodes,
+                                  float(bandwidth), src, dst)
+        if parent[dst] < 0:
+            return array('i')
+            
+        path = array('i', [dst])
+        node = dst
+        while node != src:
+            node = int(parent[node])
+            path.append(node)
+        path.reverse()
+        return path
+    
+    def _k_shortest_paths(self, src, dst, k):
+        """Find up to k loopless shortest paths from src to dst (Yen's algorithm)"""
+        first = self._shortest_path(src, dst)
+        if len(first) < 2:
+            return []
             
-        visited = set([src])
-        queue = [(src, [src])]
+        paths = [first]
+        candidates = []  # heap of (weight, path)
         
-        while queue:
-            node, path = queue.pop(0)
+        while len(paths) < k:
+            prev = paths[-1]
+            
+            # Branch off the previous path at every node
+            for i in range(len(prev) - 1):
+                root = prev[:i + 1]
+                banned_links = {_pack(path[i], path[i + 1]) for path in paths if path[:i + 1] == root}
+                spur = self._shortest_path(prev[i], dst, banned_links, banned_nodes=frozenset(root[:-1]))
+                if spur:
+                    candidate = root[:-1] + spur
+                    if candidate not in paths and all(candidate != c for _, c in candidates):
+                        heapq.heappush(candidates, (self._path_weight(candidate), candidate))
             
-            # Check all neighbors
-            for neighbor in self._get_neighbors(node):
-                if neighbor == dst:
-                    return path + [neighbor]
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append((neighbor, path + [neighbor]))
+            if not candidates:
+                break
+            paths.append(heapq.heappop(candidates)[1])
         
-        return []
+        return paths
+    
+    def _path_weight(self, path):
+        """Total link weight along a path"""
+        return sum(self.links[_pack(path[i], path[i+1])].weight for i in range(len(path) - 1))
+    
+    def _has_capacity(self, path, bandwidth):
+        """Check if every link on a path has room for bandwidth"""
+        for i in range(len(path) - 1):
+            link = self.links[_pack(path[i], path[i+1])]
+            if link.utilization + bandwidth > link.capacity:
+                return False
+        return True
+    
+    def _trace_path(self, parent, node, dst):
+        """Rebuild the path ending node -> dst by walking the parent chain"""
+        path = array('i', [dst])
+        while node is not None:
+            path.append(node)
+            node = parent[node]
+        path.reverse()
+        return path
     
     def _get_neighbors(self, node):
         """Get all neighbors of a node"""
-        neighbors = []
-        for src, dst in self.links:
-            if src == node:
-                neighbors.append(dst)
-        return neighbors
+        return self.adj[node]
     
-    def _find_backup_path(self, src, dst, primary_path):
+    def _find_backup_path(self, src, dst, primary_path, bandwidth=0):
         """Find a backup path that doesn't share links with the primary path"""
         if len(primary_path) < 2:
-            return []
+            return array('i')
             
         # Create a set of links to avoid
         avoid_links = set()
         for i in range(len(primary_path) - 1):
-            avoid_links.add((primary_path[i], primary_path[i+1]))
+            avoid_links.add(_pack(primary_path[i], primary_path[i+1]))
         
         # Find a path that avoids these links
-        visited = set([src])
-        queue = [(src, [src])]
-        
-        while queue:
-            node, path = queue.pop(0)
-            
-            # Check all neighbors
-            for neighbor in self._get_neighbors(node):
-                # Skip if this link is in the primary path
-                if (node, neighbor) in avoid_links:
-                    continue
-                    
-                if neighbor == dst:
-                    return path + [neighbor]
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append((neighbor, path + [neighbor]))
-        
-        return []
+        return self._shortest_path(src, dst, avoid_links, bandwidth)
     
     def _install_flow(self, flow):
         """Install flow in the network by updating link utilizations and flow tables"""
@@ -259,39 +696,24 @@ class SDNController:
         
         # Update link utilizations
         for i in range(len(path) - 1):
-            src, dst = path[i], path[i+1]
-            link_key = (src, dst)
+            link_key = _pack(path[i], path[i+1])
             
             if link_key in self.links:
                 self.links[link_key].add_flow(flow)
+                self._update_residual(link_key)
         
         # Install flow table entries
+        self._tick += 1
         for i in range(len(path) - 1):
-            node = path[i]
-            next_hop = path[i+1]
+            node = self.node_name[path[i]]
+            next_hop = self.node_name[path[i+1]]
             
             # Create flow table entry
-            entry = {
-                'match': {
-                    'src': flow.src,
-                    'dst': flow.dst,
-                    'flow_id': flow.flow_id
-                },
-                'action': {
-                    'output': next_hop,
-                    'priority': flow.priority
-                },
-                'stats': {
-                    'packet_count': 0,
-                    'byte_count': 0,
-                    'last_match': time.time()
-                }
-            }
-            
-            self.flow_tables[node].append(entry)
-            
-            # Sort flow table by priority (highest first)
-            self.flow_tables[node].sort(key=lambda x: x['action']['priority'], reverse=True)
+            entry = FlowEntry(flow.src, flow.dst, flow.flow_id, next_hop, flow.priority, self._tick)
+            
+            # Keep flow table sorted by priority (highest first)
+            bisect.insort(self.flow_tables[node], entry, key=_prio_key)
+            self.flow_entries.setdefault(flow.flow_id, []).append((node, entry))
         
         return True
     
@@ -301,18 +723,10 @@ class SDNController:
             flow = self.flows[flow_id]
             
             # Remove from links
-            path = flow.path
-            for i in range(len(path) - 1):
-                src, dst = path[i], path[i+1]
-                link_key = (src, dst)
-                
-                if link_key in self.links:
-                    self.links[link_key].remove_flow(flow)
+            self._release_links(flow)
             
             # Remove from flow tables
-            for node in self.flow_tables:
-                self.flow_tables[node] = [entry for entry in self.flow_tables[node] 
-                                         if entry['match']['flow_id'] != flow_id]
+            self._remove_flow_entries(flow_id)
             
             # Remove from flows dict
             del self.flows[flow_id]
@@ -323,80 +737,153 @@ class SDNController:
             return True
         return False
     
+    def _release_links(self, flow):
+        """Return the bandwidth a flow holds on the links of its path"""
+        path = flow.path
+        for i in range(len(path) - 1):
+            link_key = _pack(path[i], path[i+1])
+            
+            if link_key in self.links:
+                self.links[link_key].remove_flow(flow)
+                self._update_residual(link_key)
+        
+        # Freed capacity can make shorter or previously failed paths usable
+        with self._lock:
+            self._route_cache.clear()
+    
+    def _remove_flow_entries(self, flow_id):
+        """Remove the flow table entries installed for a flow"""
+        for node, entry in self.flow_entries.pop(flow_id, []):
+            # The switch (and its table) may have been removed since install
+            table = self.flow_tables.get(node)
+            if table is None:
+                continue
+            # Only entries of the same priority need to be searched
+            i = bisect.bisect_left(table, _prio_key(entry), key=_prio_key)
+            while i < len(table) and table[i] is not entry:
+                i += 1
+            if i < len(table):
+                del table[i]
+    
     def simulate_link_failure(self, src, dst):
         """Simulate a link failure between src and dst"""
         print(f"Simulating link failure: {src} → {dst}")
         
-        # Find affected flows
-        affected_flows = []
-        link_key = (src, dst)
+        link_key = self._link_key(src, dst)
         
         if link_key in self.links:
-            for flow_id in list(self.links[link_key].flows):
-                if flow_id in self.flows:
-                    affected_flows.append(self.flows[flow_id])
+            # Link.flows already indexes the affected flows; snapshot it
+            # before the link is removed
+            affected_flows = [self.flows[flow_id] for flow_id in self.links[link_key].flows
+                              if flow_id in self.flows]
             
             # Remove the link
-            self.remove_link(src, dst)
+            self._remove_link(link_key)
+            
+            # Apply a pending batch change now, before the searches below
+            # fan out to worker threads
+            if self._topology_dirty:
+                self._invalidate_routing()
             
-            # Reroute affected flows
-            for flow in affected_flows:
-                self._reroute_flow(flow)
+            # Reroute affected flows: precomputed paths first, then a new search
+            self._in_failover = True
+            try:
+                pending = [flow for flow in affected_flows if not self._reroute_flow(flow)]
+                self._reroute_searched(pending)
+            finally:
+                self._in_failover = False
             
             return True
         return False
     
+    def _cached_paths(self, pair):
+        """Return the cached paths for pair that are still intact, pruning the rest"""
+        paths = self.path_cache.get(pair)
+        if not paths:
+            return []
+        valid = [path for path in paths if self._validate_path(path)]
+        if len(valid) < len(paths):
+            if valid:
+                self.path_cache[pair] = valid
+            else:
+                # Recomputed on the next add_flow for this pair
+                del self.path_cache[pair]
+        return valid
+    
     def _reroute_flow(self, flow):
-        """Reroute a flow after a topology change"""
+        """Uninstall a flow and reinstall it on its backup or a cached path, if one is usable"""
         # Remove flow from current path
-        path = flow.path
-        for i in range(len(path) - 1):
-            src, dst = path[i], path[i+1]
-            link_key = (src, dst)
-            
-            if link_key in self.links:
-                self.links[link_key].remove_flow(flow)
+        self._release_links(flow)
         
         # Clear flow tables for this flow
-        for node in self.flow_tables:
-            self.flow_tables[node] = [entry for entry in self.flow_tables[node] 
-                                     if entry['match']['flow_id'] != flow.flow_id]
+        self._remove_flow_entries(flow.flow_id)
+        
+        src, dst = self.node_idx[flow.src], self.node_idx[flow.dst]
         
         # If backup path exists, use it
-        if flow.backup_path and self._validate_path(flow.backup_path):
-            flow.path, flow.backup_path = flow.backup_path, []
+        if (flow.backup_path and self._validate_path(flow.backup_path)
+                and self._has_capacity(flow.backup_path, flow.bandwidth)):
+            flow.path, flow.backup_path = flow.backup_path, array('i')
             success = self._install_flow(flow)
             if success:
                 print(f"Flow {flow.flow_id} rerouted using backup path")
                 # Compute a new backup path
-                flow.backup_path = self._find_backup_path(flow.src, flow.dst, flow.path)
+                flow.backup_path = self._find_backup_path(src, dst, flow.path, flow.bandwidth)
                 return True
         
-        # Try to find a new path
-        new_path = self._find_simple_path(flow.src, flow.dst)
-        if new_path:
-            flow.path = new_path
-            flow.backup_path = self._find_backup_path(flow.src, flow.dst, new_path)
-            success = self._install_flow(flow)
-            if success:
-                print(f"Flow {flow.flow_id} rerouted using new path")
-                return True
+        # Try the precomputed failover candidates
+        for path in self._cached_paths((src, dst)):
+            if self._has_capacity(path, flow.bandwidth):
+                flow.path = path
+                flow.backup_path = self._find_backup_path(src, dst, path, flow.bandwidth)
+                success = self._install_flow(flow)
+                if success:
+                    print(f"Flow {flow.flow_id} rerouted using cached path")
+                    return True
         
-        # If we couldn't reroute, mark the flow as inactive
-        flow.active = False
-        print(f"Flow {flow.flow_id} could not be rerouted - marked inactive")
-        self.stats['active_flows'] -= 1
         return False
     
+    def _search_paths(self, flow):
+        """Compute a (path, backup_path) pair for an uninstalled flow"""
+        src, dst = self.node_idx[flow.src], self.node_idx[flow.dst]
+        path = self._find_simple_path(src, dst, flow.bandwidth)
+        if not path:
+            return path, array('i')
+        return path, self._find_backup_path(src, dst, path, flow.bandwidth)
+    
+    def _reroute_searched(self, flows):
+        """Search new paths for uninstalled flows in parallel, then install them one at a time"""
+        # Only the compiled kernel releases the GIL; pure Python searches
+        # would just contend for it, so they run in a plain loop
+        if len(flows) > 1 and len(self.node_name) >= JIT_MIN_NODES and _jit_kernel() is not None:
+            # The topology is read-only while the searches run
+            with ThreadPoolExecutor(max_workers=min(len(flows), REROUTE_WORKERS)) as executor:
+                results = list(executor.map(self._search_paths, flows))
+        else:
+            results = [self._search_paths(flow) for flow in flows]
+        
+        for flow, (path, backup_path) in zip(flows, results):
+            # Flows installed earlier in this loop may have used up the capacity
+            if path and not self._has_capacity(path, flow.bandwidth):
+                path, backup_path = self._search_paths(flow)
+            
+            if path:
+                flow.path = path
+                flow.backup_path = backup_path
+                success = self._install_flow(flow)
+                if success:
+                    print(f"Flow {flow.flow_id} rerouted using new path")
+                    continue
+            
+            # If we couldn't reroute, mark the flow as inactive
+            flow.active = False
+            print(f"Flow {flow.flow_id} could not be rerouted - marked inactive")
+            self.stats['active_flows'] -= 1
+    
     def _validate_path(self, path):
         """Check if a path is still valid in the current topology"""
-        if len(path) < 2:
-            return False
-            
-        for i in range(len(path) - 1):
-            if (path[i], path[i+1]) not in self.links:
-                return False
-        return True
+        links = self.links
+        return len(path) >= 2 and all(_pack(u, v) in links for u, v in zip(path, path[1:]))
     
     def print_flow_tables(self):
         """Print the flow tables for all switches"""
@@ -407,9 +894,9 @@ class SDNController:
             print("-" * 80)
             
             for entry in table:
-                match_str = f"src={entry['match']['src']}, dst={entry['match']['dst']}, id={entry['match']['flow_id']}"
-                action_str = f"output={entry['action']['output']}, pri={entry['action']['priority']}"
-                stats_str = f"pkts={entry['stats']['packet_count']}, bytes={entry['stats']['byte_count']}"
+                match_str = f"src={entry.src}, dst={entry.dst}, id={entry.flow_id}"
+                action_str = f"output={entry.output}, pri={entry.priority}"
+                stats_str = f"pkts={entry.packet_count}, bytes={entry.byte_count}"
                 
                 print(f"{match_str:<40} | {action_str:<20} | {stats_str}")
     
@@ -426,8 +913,12 @@ class SDNController:
         print("-" * 40)
         print(f"Nodes: {self.nodes}")
         print("\nLinks:")
-        for (src, dst), link in self.links.items():
-            print(f"  {src} → {dst} (Utilization: {link.utilization}/{link.capacity})")
+        for link in self.links.values():
+            print(f"  {link.src} → {link.dst} (Utilization: {link.utilization}/{link.capacity})")
+    
+    def format_path(self, path):
+        """Render a path of node indices as node ids joined by arrows"""
+        return " → ".join(self.node_name[node] for node in path)
     
     def print_flows(self):
         """Print all flows in the network"""
@@ -435,8 +926,8 @@ class SDNController:
         print("-" * 80)
         for flow_id, flow in self.flows.items():
             if flow.active:
-                path_str = " → ".join(str(node) for node in flow.path)
-                backup_str = " → ".join(str(node) for node in flow.backup_path) if flow.backup_path else "None"
+                path_str = self.format_path(flow.path)
+                backup_str = self.format_path(flow.backup_path) if flow.backup_path else "None"
                 print(f"Flow {flow_id}: {flow.src} → {flow.dst} (Priority: {flow.priority}, BW: {flow.bandwidth})")
                 print(f"  Primary Path: {path_str}")
                 print(f"  Backup Path: {backup_str}")
@@ -453,7 +944,11 @@ class SDNController:
             print("No inactive flows")
 
 class SDNControllerCLI(cmd.Cmd):
-    """Command-line interface for the SDN Controller"""
+    """
+    Command-line interface for the SDN Controller.
+    Commands are dispatched through a verb table instead of cmd.Cmd's do_* lookup;
+    cmd.Cmd is only used for the interactive loop.
+    """
     intro = "SDN Controller CLI. Type help or ? to list commands.\n"
     prompt = "sdn> "
     
@@ -461,154 +956,150 @@ class SDNControllerCLI(cmd.Cmd):
         super().__init__()
         self.controller = controller
         
-    def do_add_node(self, arg):
-        """Add a node to the network: add_node <node_id>"""
+        # verb -> (handler, argument types, required argument count, missing-argument error)
+        self.dispatch = {
+            'add_node': (self._add_node, (str,), 1, "Error: Node ID required"),
+            'add_link': (self._add_link, (str, str, int, int, int), 2, "Error: Source and destination nodes required"),
+            'remove_node': (self._remove_node, (str,), 1, "Error: Node ID required"),
+            'remove_link': (self._remove_link, (str, str), 2, "Error: Source and destination nodes required"),
+            'add_flow': (self._add_flow, (str, str, int, int), 2, "Error: Source and destination nodes required"),
+            'remove_flow': (self._remove_flow, (int,), 1, "Error: Flow ID required"),
+            'simulate_failure': (self._simulate_failure, (str, str), 2, "Error: Source and destination nodes required"),
+            'show_flows': (self._show_flows, (), 0, None),
+            'show_topology': (self._show_topology, (), 0, None),
+            'show_flow_tables': (self._show_flow_tables, (), 0, None),
+            'show_stats': (self._show_stats, (), 0, None),
+            'help': (self._help, (str,), 0, None),
+            'exit': (self._exit, (), 0, None),
+            'quit': (self._exit, (), 0, None),
+            'EOF': (self._exit, (), 0, None),
+        }
+    
+    def onecmd(self, line):
+        """Split a command line once, coerce its arguments and call the handler"""
+        args = line.split()
+        if not args:
+            return self.emptyline()
+        if args[0].startswith('?'):
+            args[0:1] = ['help'] + ([args[0][1:]] if len(args[0]) > 1 else [])
+            
+        verb = args.pop(0)
+        if verb not in self.dispatch:
+            return self.default(line)
+            
+        handler, types, required, missing = self.dispatch[verb]
+        if len(args) < required:
+            print(missing)
+            return False
+            
         try:
-            node_id = arg.strip()
-            if not node_id:
-                print("Error: Node ID required")
-                return
-                
-            success = self.controller.add_node(node_id)
-            if success:
-                print(f"Node {node_id} added successfully")
-            else:
-                print(f"Error: Node {node_id} already exists")
+            return handler(*[coerce(arg) for coerce, arg in zip(types, args)])
         except Exception as e:
             print(f"Error: {str(e)}")
+            return False
+    
+    def run_script(self, lines):
+        """Replay commands from an iterable of lines, stopping at exit/quit"""
+        for line in lines:
+            if self.onecmd(line):
+                return True
+        return False
+    
+    def completenames(self, text, *ignored):
+        """Complete command names from the dispatch table"""
+        return [verb for verb in self.dispatch if verb.startswith(text) and verb != 'EOF']
+        
+    def _add_node(self, node_id):
+        """Add a node to the network: add_node <node_id>"""
+        success = self.controller.add_node(node_id)
+        if success:
+            print(f"Node {node_id} added successfully")
+        else:
+            print(f"Error: Node {node_id} already exists")
     
-    def do_add_link(self, arg):
+    def _add_link(self, src, dst, capacity=10, weight=1, delay=1):
         """Add a link between nodes: add_link <src> <dst> [capacity] [weight] [delay]"""
-        try:
-            args = arg.strip().split()
-            if len(args) < 2:
-                print("Error: Source and destination nodes required")
-                return
-                
-            src, dst = args[0], args[1]
-            capacity = int(args[2]) if len(args) > 2 else 10
-            weight = int(args[3]) if len(args) > 3 else 1
-            delay = int(args[4]) if len(args) > 4 else 1
-            
-            success = self.controller.add_link(src, dst, capacity, weight, delay)
-            if success:
-                print(f"Link {src} → {dst} added successfully")
-            else:
-                print(f"Error: Could not add link (nodes might not exist)")
-        except Exception as e:
-            print(f"Error: {str(e)}")
+        success = self.controller.add_link(src, dst, capacity, weight, delay)
+        if success:
+            print(f"Link {src} → {dst} added successfully")
+        else:
+            print(f"Error: Could not add link (nodes might not exist)")
     
-    def do_remove_node(self, arg):
+    def _remove_node(self, node_id):
         """Remove a node from the network: remove_node <node_id>"""
-        try:
-            node_id = arg.strip()
-            if not node_id:
-                print("Error: Node ID required")
-                return
-                
-            success = self.controller.remove_node(node_id)
-            if success:
-                print(f"Node {node_id} removed successfully")
-            else:
-                print(f"Error: Node {node_id} not found")
-        except Exception as e:
-            print(f"Error: {str(e)}")
+        success = self.controller.remove_node(node_id)
+        if success:
+            print(f"Node {node_id} removed successfully")
+        else:
+            print(f"Error: Node {node_id} not found")
     
-    def do_remove_link(self, arg):
+    def _remove_link(self, src, dst):
         """Remove a link from the network: remove_link <src> <dst>"""
-        try:
-            args = arg.strip().split()
-            if len(args) < 2:
-                print("Error: Source and destination nodes required")
-                return
-                
-            src, dst = args[0], args[1]
-            success = self.controller.remove_link(src, dst)
-            if success:
-                print(f"Link {src} → {dst} removed successfully")
-            else:
-                print(f"Error: Link not found")
-        except Exception as e:
-            print(f"Error: {str(e)}")
+        success = self.controller.remove_link(src, dst)
+        if success:
+            print(f"Link {src} → {dst} removed successfully")
+        else:
+            print(f"Error: Link not found")
     
-    def do_add_flow(self, arg):
+    def _add_flow(self, src, dst, priority=0, bandwidth=1):
         """Add a flow to the network: add_flow <src> <dst> [priority] [bandwidth]"""
-        try:
-            args = arg.strip().split()
-            if len(args) < 2:
-                print("Error: Source and destination nodes required")
-                return
-                
-            src, dst = args[0], args[1]
-            priority = int(args[2]) if len(args) > 2 else 0
-            bandwidth = int(args[3]) if len(args) > 3 else 1
-            
-            flow = self.controller.add_flow(src, dst, priority, bandwidth)
-            if flow:
-                print(f"Flow added successfully: {flow}")
-                print(f"  Primary Path: {' → '.join(flow.path)}")
-                if flow.backup_path:
-                    print(f"  Backup Path: {' → '.join(flow.backup_path)}")
-                else:
-                    print("  No backup path available")
+        flow = self.controller.add_flow(src, dst, priority, bandwidth)
+        if flow:
+            print(f"Flow added successfully: {flow}")
+            print(f"  Primary Path: {self.controller.format_path(flow.path)}")
+            if flow.backup_path:
+                print(f"  Backup Path: {self.controller.format_path(flow.backup_path)}")
             else:
-                print(f"Error: Could not add flow (nodes might not exist or no path available)")
-        except Exception as e:
-            print(f"Error: {str(e)}")
+                print("  No backup path available")
+        else:
+            print(f"Error: Could not add flow (nodes might not exist or no path available)")
     
-    def do_remove_flow(self, arg):
+    def _remove_flow(self, flow_id):
         """Remove a flow from the network: remove_flow <flow_id>"""
-        try:
-            flow_id = int(arg.strip())
-            success = self.controller.remove_flow(flow_id)
-            if success:
-                print(f"Flow {flow_id} removed successfully")
-            else:
-                print(f"Error: Flow {flow_id} not found")
-        except Exception as e:
-            print(f"Error: {str(e)}")
+        success = self.controller.remove_flow(flow_id)
+        if success:
+            print(f"Flow {flow_id} removed successfully")
+        else:
+            print(f"Error: Flow {flow_id} not found")
     
-    def do_simulate_failure(self, arg):
+    def _simulate_failure(self, src, dst):
         """Simulate a link failure: simulate_failure <src> <dst>"""
-        try:
-            args = arg.strip().split()
-            if len(args) < 2:
-                print("Error: Source and destination nodes required")
-                return
-                
-            src, dst = args[0], args[1]
-            success = self.controller.simulate_link_failure(src, dst)
-            if success:
-                print(f"Link failure simulated: {src} → {dst}")
-            else:
-                print(f"Error: Link not found")
-        except Exception as e:
-            print(f"Error: {str(e)}")
+        success = self.controller.simulate_link_failure(src, dst)
+        if success:
+            print(f"Link failure simulated: {src} → {dst}")
+        else:
+            print(f"Error: Link not found")
     
-    def do_show_flows(self, arg):
+    def _show_flows(self):
         """Show all flows in the network"""
         self.controller.print_flows()
     
-    def do_show_topology(self, arg):
+    def _show_topology(self):
         """Show the network topology"""
         self.controller.print_topology()
     
-    def do_show_flow_tables(self, arg):
+    def _show_flow_tables(self):
         """Show flow tables for all switches"""
         self.controller.print_flow_tables()
     
-    def do_show_stats(self, arg):
+    def _show_stats(self):
         """Show controller statistics"""
         self.controller.print_statistics()
     
-    def do_exit(self, arg):
+    def _help(self, verb=None):
+        """List available commands or show help for one: help [command]"""
+        if verb is None:
+            self.stdout.write(f"{self.doc_leader}\n")
+            self.print_topics(self.doc_header, sorted(v for v in self.dispatch if v != 'EOF'), 15, 80)
+        elif verb in self.dispatch:
+            self.stdout.write(f"{self.dispatch[verb][0].__doc__}\n")
+        else:
+            self.stdout.write(f"{self.nohelp % (verb,)}\n")
+    
+    def _exit(self):
         """Exit the program"""
         print("Exiting SDN Controller CLI")
         return True
-        
-    def do_quit(self, arg):
-        """Exit the program"""
-        return self.do_exit(arg)
     
     def emptyline(self):
         """Do nothing on empty line"""
@@ -618,22 +1109,23 @@ def create_sample_topology(controller):
     """Create a sample topology for testing"""
     print("Creating sample topology...")
     
-    # Add nodes
-    controller.add_node("s1")
-    controller.add_node("s2")
-    controller.add_node("s3")
-    controller.add_node("s4")
-    controller.add_node("s5")
-    controller.add_node("s6")
-    
-    # Add links
-    controller.add_link("s1", "s2", 10, 1, 1)
-    controller.add_link("s1", "s3", 5, 2, 2)
-    controller.add_link("s2", "s4", 10, 1, 1)
-    controller.add_link("s2", "s5", 5, 2, 2)
-    controller.add_link("s3", "s5", 10, 1, 1)
-    controller.add_link("s4", "s6", 10, 1, 1)
-    controller.add_link("s5", "s6", 5, 2, 2)
+    with controller.batch():
+        # Add nodes
+        controller.add_node("s1")
+        controller.add_node("s2")
+        controller.add_node("s3")
+        controller.add_node("s4")
+        controller.add_node("s5")
+        controller.add_node("s6")
+        
+        # Add links
+        controller.add_link("s1", "s2", 10, 1, 1)
+        controller.add_link("s1", "s3", 5, 2, 2)
+        controller.add_link("s2", "s4", 10, 1, 1)
+        controller.add_link("s2", "s5", 5, 2, 2)
+        controller.add_link("s3", "s5", 10, 1, 1)
+        controller.add_link("s4", "s6", 10, 1, 1)
+        controller.add_link("s5", "s6", 5, 2, 2)
     
     print("Sample topology created successfully!")
 